@@ -1,199 +1,241 @@
-#!/usr/bin/env python3
-"""
-Opinion OpAmp Runner
-A simple interface to run the conceptual operational amplifier for opinion analysis
-"""
-
-import sys
-from getpass import getpass
-
-# Import the q-opamp module and select_output_type function
-try:
-    import q_opamp
-    from q_opamp import ConceptualOpAmp, select_output_type
-except ImportError as e:
-    print(f"❌ Error importing q_opamp9.py: {e}")
-    print("Make sure q_opamp9.py is in the same directory as this script")
-    sys.exit(1)
-
-def get_user_input():
-    """Get user inputs for the opinion analysis"""
-    print("**Conceptual OpAmp Difference Engine**")
-    print("=" * 50)
-    
-    # Get API key
-    api_key = getpass("Enter your OpenAI API key: ")
-    if not api_key.strip():
-        print("❌ API key is required")
-        sys.exit(1)
-    
-    # Get system context
-    print("\n📋 System Context")
-    context = input("Enter the discussion context/topic (e.g., 'climate change policy', 'education reform'): ").strip()
-    if not context:
-        context = "general discussion"
-    
-    # Get first opinion (positive input)
-    print("\n💭 First Opinion (Positive Input)")
-    print("Enter the first opinion (press Enter twice when done):")
-    opinion1_lines = []
-    while True:
-        line = input()
-        if line == "" and opinion1_lines:
-            break
-        opinion1_lines.append(line)
-    opinion1 = "\n".join(opinion1_lines).strip()
-    if not opinion1:
-        print("❌ First opinion cannot be empty")
-        sys.exit(1)
-    
-    # Get second opinion (negative input)
-    print("\n💭 Second Opinion (Negative Input)")
-    print("Enter the second opinion (press Enter twice when done):")
-    opinion2_lines = []
-    while True:
-        line = input()
-        if line == "" and opinion2_lines:
-            break
-        opinion2_lines.append(line)
-    opinion2 = "\n".join(opinion2_lines).strip()
-    if not opinion2:
-        print("❌ Second opinion cannot be empty")
-        sys.exit(1)
-    
-    return api_key, context, opinion1, opinion2
-
-def display_results(result, final_outputs):
-    """Display the op-amp analysis results in a formatted way"""
-    print("\n" + "="*70)
-    print("🎯 CONCEPTUAL OP-AMP ANALYSIS RESULTS")
-    print("="*70)
-    
-    # Ground Truth
-    print("\n⚖️  GROUND TRUTH (NULL HYPOTHESIS):")
-    print("-" * 40)
-    print(f"{result['ground_truth']}")
-    
-    # Input Analysis
-    print("\n📊 INPUT ANALYSIS:")
-    print("-" * 40)
-    print(f"\n➕ POSITIVE INPUT (Opinion 1):")
-    print(f"   Content: {result['positive_input']['content']}")
-    print(f"   Ethos:    {result['positive_input']['ethos']}")
-    print(f"   Logos:    {result['positive_input']['logos']}")
-    print(f"   Energeia: {result['positive_input']['energeia']}")
-    print(f"\n➖ NEGATIVE INPUT (Opinion 2):")
-    print(f"   Content: {result['negative_input']['content']}")
-    print(f"   Ethos:    {result['negative_input']['ethos']}")
-    print(f"   Logos:    {result['negative_input']['logos']}")
-    print(f"   Energeia: {result['negative_input']['energeia']}")
-    print(f"\n📈 RHETORICAL DELTAS:")
-    print("-" * 40)
-    print(f"\n🎭 ETHOS DELTA:")
-    print(f"   Null Hypothesis: {result['deltas']['ethos']['null_hypothesis']}")
-    print(f"   Analysis: {result['deltas']['ethos']['delta_analysis']}")
-    print(f"\n🧠 LOGOS DELTA:")
-    print(f"   Null Hypothesis: {result['deltas']['logos']['null_hypothesis']}")
-    print(f"   Analysis: {result['deltas']['logos']['delta_analysis']}")
-    print(f"\n⚡ ENERGEIA DELTA:")
-    print(f"   Null Hypothesis: {result['deltas']['energeia']['null_hypothesis']}")
-    print(f"   Analysis: {result['deltas']['energeia']['delta_analysis']}")
-    print(f"\n🔬 FIRST SYNTHESIS (DELTA SYNTHESIS):")
-    print("-" * 40)
-    print(f"{result['first_synthesis']}")
-    print("\n" + "="*70)
-    
-    # Display all final outputs generated
-    for idx, (out_type, out_text) in enumerate(final_outputs):
-        print(f"\n🎭 FINAL OUTPUT ({out_type}):")
-        print("-" * 40)
-        print(f"{out_text}")
-        print("\n" + "="*70)
-
-def main():
-    """Main function to run the opinion amplifier"""
-    try:
-        # Get user inputs
-        api_key, context, opinion1, opinion2 = get_user_input()
-        
-        # Output type selection
-        output_type, is_custom = select_output_type()
-        
-        # Initialize the op-amp
-        print(f"\n🔧 Initializing Opinion OpAmp with context: '{context}'")
-        opamp = ConceptualOpAmp(api_key, context)
-        
-        # Process the opinions (full workflow)
-        print("\n🚀 Processing opinions through the conceptual op-amp...")
-        print("This may take a moment as we analyze the rhetorical components...")
-        result = opamp.differentiate(opinion1, opinion2, output_type, is_custom)
-        # Store all reformattings
-        final_outputs = [(output_type, result['final_output'])]
-        
-        # Show all output (full analysis, deltas, first output)
-        display_results(result, final_outputs)
-        
-        # Now ask if the user wants another context, only display new output
-        while True:
-            more_context = input("\n🌀 Would you like the output in a different context/format? (y/n): ").strip().lower()
-            if more_context not in ['y', 'yes']:
-                break
-            # User selects new output type
-            new_output_type, new_is_custom = select_output_type()
-            # Use only the first_synthesis for further restatement!
-            new_final = opamp._resynthesize_output(
-                result['first_synthesis'],
-                result['deltas'],
-                result['ground_truth'],
-                new_output_type,
-                new_is_custom
-            )
-            final_outputs.append((new_output_type, new_final))
-            print(f"\n🎭 FINAL OUTPUT ({new_output_type}):")
-            print("-" * 40)
-            print(f"{new_final}")
-            print("\n" + "="*70)
-        
-        # Ask if user wants to save results
-        save_choice = input("\n💾 Would you like to save these results to a file? (y/n): ").lower()
-        if save_choice in ['y', 'yes']:
-            filename = input("Enter filename (without extension): ").strip()
-            if not filename:
-                filename = "opamp_results"
-            with open(f"{filename}.txt", "w", encoding="utf-8") as f:
-                f.write("CONCEPTUAL OP-AMP ANALYSIS RESULTS\n")
-                f.write("="*50 + "\n\n")
-                f.write(f"Context: {context}\n\n")
-                f.write(f"Ground Truth: {result['ground_truth']}\n\n")
-                f.write(f"Positive Input (Opinion 1): {result['positive_input']['content']}\n")
-                f.write(f"Ethos: {result['positive_input']['ethos']}, ")
-                f.write(f"Logos: {result['positive_input']['logos']}, ")
-                f.write(f"Energeia: {result['positive_input']['energeia']}\n\n")
-                f.write(f"Negative Input (Opinion 2): {result['negative_input']['content']}\n")
-                f.write(f"Ethos: {result['negative_input']['ethos']}, ")
-                f.write(f"Logos: {result['negative_input']['logos']}, ")
-                f.write(f"Energeia: {result['negative_input']['energeia']}\n\n")
-                f.write(f"Ethos Delta:\n")
-                f.write(f"  Null: {result['deltas']['ethos']['null_hypothesis']}\n")
-                f.write(f"  Analysis: {result['deltas']['ethos']['delta_analysis']}\n\n")
-                f.write(f"Logos Delta:\n")
-                f.write(f"  Null: {result['deltas']['logos']['null_hypothesis']}\n")
-                f.write(f"  Analysis: {result['deltas']['logos']['delta_analysis']}\n\n")
-                f.write(f"Energeia Delta:\n")
-                f.write(f"  Null: {result['deltas']['energeia']['null_hypothesis']}\n")
-                f.write(f"  Analysis: {result['deltas']['energeia']['delta_analysis']}\n\n")
-                f.write(f"First Synthesis (Delta Synthesis):\n{result['first_synthesis']}\n\n")
-                for out_type, out_text in final_outputs:
-                    f.write(f"Final Output ({out_type}):\n{out_text}\n\n")
-            print(f"✅ Results saved to {filename}.txt")
-    
-    except KeyboardInterrupt:
-        print("\n\n👋 Operation cancelled by user")
-        sys.exit(0)
-    except Exception as e:
-        print(f"\n❌ An error occurred: {e}")
-        print("Please check your API key and try again")
-        sys.exit(1)
-
-if __name__ == "__main__":
-    main()
+#!/usr/bin/env python3
+"""
+Opinion OpAmp Runner
+A simple interface to run the conceptual operational amplifier for opinion analysis
+"""
+
+import logging
+import os
+import sys
+from getpass import getpass
+
+# Separator strings built once at import; every banner below reuses them.
+BANNER = "=" * 70
+RULE = "-" * 40
+HEADER_RULE = "=" * 50
+
+# Import the q-opamp module and select_output_type function
+try:
+    import q_opamp
+    from q_opamp import ConceptualOpAmp, select_output_type
+except ImportError as e:
+    print(f"❌ Error importing q_opamp9.py: {e}")
+    print("Make sure q_opamp9.py is in the same directory as this script")
+    sys.exit(1)
+
+def read_opinion(heading, ordinal):
+    """Read one multi-line opinion, terminated by an empty line, as a single block"""
+    print(f"\n💭 {heading}")
+    print(f"Enter the {ordinal} opinion (press Enter twice when done):")
+    lines = []
+    while True:
+        line = input()
+        if line == "" and lines:
+            break
+        lines.append(line)
+    opinion = "\n".join(lines).strip()
+    if not opinion:
+        print(f"❌ {ordinal.capitalize()} opinion cannot be empty")
+        sys.exit(1)
+    return opinion
+
+def get_credentials():
+    """Get the API key and discussion context"""
+    print("**Conceptual OpAmp Difference Engine**")
+    print(HEADER_RULE)
+
+    # Get API key
+    api_key = getpass("Enter your OpenAI API key: ")
+    if not api_key.strip():
+        print("❌ API key is required")
+        sys.exit(1)
+
+    # Get system context
+    print("\n📋 System Context")
+    context = input("Enter the discussion context/topic (e.g., 'climate change policy', 'education reform'): ").strip()
+    if not context:
+        context = "general discussion"
+
+    return api_key, context
+
+def display_results(result, final_outputs):
+    """Display the op-amp analysis results in a formatted way.
+    The report is assembled in memory and written with one print call."""
+    lines = [
+        "\n" + BANNER,
+        "🎯 CONCEPTUAL OP-AMP ANALYSIS RESULTS",
+        BANNER,
+        # Ground Truth
+        "\n⚖️  GROUND TRUTH (NULL HYPOTHESIS):",
+        RULE,
+        f"{result['ground_truth']}",
+        # Input Analysis
+        "\n📊 INPUT ANALYSIS:",
+        RULE,
+        f"\n➕ POSITIVE INPUT (Opinion 1):",
+        f"   Content: {result['positive_input']['content']}",
+        f"   Ethos:    {result['positive_input']['ethos']}",
+        f"   Logos:    {result['positive_input']['logos']}",
+        f"   Energeia: {result['positive_input']['energeia']}",
+        f"\n➖ NEGATIVE INPUT (Opinion 2):",
+        f"   Content: {result['negative_input']['content']}",
+        f"   Ethos:    {result['negative_input']['ethos']}",
+        f"   Logos:    {result['negative_input']['logos']}",
+        f"   Energeia: {result['negative_input']['energeia']}",
+        f"\n📈 RHETORICAL DELTAS:",
+        RULE,
+        f"\n🎭 ETHOS DELTA:",
+        f"   Null Hypothesis: {result['deltas']['ethos']['null_hypothesis']}",
+        f"   Analysis: {result['deltas']['ethos']['delta_analysis']}",
+        f"\n🧠 LOGOS DELTA:",
+        f"   Null Hypothesis: {result['deltas']['logos']['null_hypothesis']}",
+        f"   Analysis: {result['deltas']['logos']['delta_analysis']}",
+        f"\n⚡ ENERGEIA DELTA:",
+        f"   Null Hypothesis: {result['deltas']['energeia']['null_hypothesis']}",
+        f"   Analysis: {result['deltas']['energeia']['delta_analysis']}",
+        f"\n🔬 FIRST SYNTHESIS (DELTA SYNTHESIS):",
+        RULE,
+        f"{result['first_synthesis']}",
+        "\n" + BANNER,
+    ]
+    # All final outputs generated so far
+    for out_type, out_text in final_outputs:
+        lines += [
+            f"\n🎭 FINAL OUTPUT ({out_type}):",
+            RULE,
+            f"{out_text}",
+            "\n" + BANNER,
+        ]
+    print("\n".join(lines))
+
+def main():
+    """Main function to run the opinion amplifier"""
+    # One stderr handler on the q_opamp logger only, so status lines stay
+    # separate from the results on stdout and third-party loggers (httpx's
+    # per-request INFO lines in particular) stay silent. Q_OPAMP_LOG_LEVEL
+    # overrides the level, e.g. WARNING to silence the step chatter.
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    pipeline_log = logging.getLogger("q_opamp")
+    pipeline_log.addHandler(handler)
+    pipeline_log.setLevel(os.environ.get("Q_OPAMP_LOG_LEVEL", "INFO").upper())
+    opamp = None
+    try:
+        # Get credentials, then build the op-amp straight away: the heavy
+        # openai import, HTTP client construction, and cache setup happen
+        # while the user is still typing the opinions, instead of delaying
+        # the first API call.
+        api_key, context = get_credentials()
+        print(f"\n🔧 Initializing Opinion OpAmp with context: '{context}'")
+        opamp = ConceptualOpAmp(api_key, context)
+
+        # Get the opinions and the desired output format
+        opinion1 = read_opinion("First Opinion (Positive Input)", "first")
+        opinion2 = read_opinion("Second Opinion (Negative Input)", "second")
+        output_type, is_custom = select_output_type()
+
+        # Process the opinions (full workflow)
+        print("\n🚀 Processing opinions through the conceptual op-amp...")
+        print("This may take a moment as we analyze the rhetorical components...")
+        result = opamp.differentiate(opinion1, opinion2, output_type, is_custom, stream=True)
+        # Store all reformattings
+        final_outputs = [(output_type, result['final_output'])]
+        
+        # Show all output (full analysis, deltas, first output)
+        display_results(result, final_outputs)
+        
+        # Now ask if the user wants another context, only display new output
+        while True:
+            more_context = input("\n🌀 Would you like the output in a different context/format? (y/n, or 'all' for every built-in format): ").strip().lower()
+            if more_context == 'all':
+                # Generate every not-yet-produced built-in format in one
+                # concurrent batch instead of one round-trip at a time.
+                done = {out_type for out_type, _ in final_outputs}
+                remaining = [t for t in q_opamp.FINAL_OUTPUT_PROMPTS if t not in done]
+                if not remaining:
+                    print("✅ Every built-in format has already been generated.")
+                    continue
+                print(f"\n🚀 Generating {len(remaining)} formats concurrently...")
+                texts = opamp.resynthesize_many(
+                    result['first_synthesis'],
+                    result['deltas'],
+                    result['ground_truth'],
+                    [(out_type, False) for out_type in remaining]
+                )
+                for out_type, out_text in zip(remaining, texts):
+                    final_outputs.append((out_type, out_text))
+                    print(f"\n🎭 FINAL OUTPUT ({out_type}):")
+                    print(RULE)
+                    print(out_text)
+                    print("\n" + BANNER)
+                continue
+            if more_context not in ['y', 'yes']:
+                break
+            # User selects new output type
+            new_output_type, new_is_custom = select_output_type()
+            # Use only the first_synthesis for further restatement!
+            # Stream the rephrased output so it appears as it is generated.
+            print(f"\n🎭 FINAL OUTPUT ({new_output_type}):")
+            print(RULE)
+            new_final = opamp.resynthesize_output(
+                result['first_synthesis'],
+                result['deltas'],
+                result['ground_truth'],
+                new_output_type,
+                new_is_custom,
+                stream=True
+            )
+            final_outputs.append((new_output_type, new_final))
+            print("\n" + BANNER)
+        
+        # Ask if user wants to save results
+        save_choice = input("\n💾 Would you like to save these results to a file? (y/n): ").lower()
+        if save_choice in ['y', 'yes']:
+            filename = input("Enter filename (without extension): ").strip()
+            if not filename:
+                filename = "opamp_results"
+            # Assemble the report in memory and write it in one call
+            report = [
+                "CONCEPTUAL OP-AMP ANALYSIS RESULTS\n",
+                HEADER_RULE + "\n\n",
+                f"Context: {context}\n\n",
+                f"Ground Truth: {result['ground_truth']}\n\n",
+                f"Positive Input (Opinion 1): {result['positive_input']['content']}\n",
+                f"Ethos: {result['positive_input']['ethos']}, ",
+                f"Logos: {result['positive_input']['logos']}, ",
+                f"Energeia: {result['positive_input']['energeia']}\n\n",
+                f"Negative Input (Opinion 2): {result['negative_input']['content']}\n",
+                f"Ethos: {result['negative_input']['ethos']}, ",
+                f"Logos: {result['negative_input']['logos']}, ",
+                f"Energeia: {result['negative_input']['energeia']}\n\n",
+                f"Ethos Delta:\n",
+                f"  Null: {result['deltas']['ethos']['null_hypothesis']}\n",
+                f"  Analysis: {result['deltas']['ethos']['delta_analysis']}\n\n",
+                f"Logos Delta:\n",
+                f"  Null: {result['deltas']['logos']['null_hypothesis']}\n",
+                f"  Analysis: {result['deltas']['logos']['delta_analysis']}\n\n",
+                f"Energeia Delta:\n",
+                f"  Null: {result['deltas']['energeia']['null_hypothesis']}\n",
+                f"  Analysis: {result['deltas']['energeia']['delta_analysis']}\n\n",
+                f"First Synthesis (Delta Synthesis):\n{result['first_synthesis']}\n\n",
+            ]
+            report += [f"Final Output ({out_type}):\n{out_text}\n\n" for out_type, out_text in final_outputs]
+            with open(f"{filename}.txt", "w", encoding="utf-8") as f:
+                f.write("".join(report))
+            print(f"✅ Results saved to {filename}.txt")
+    
+    except KeyboardInterrupt:
+        print("\n\n👋 Operation cancelled by user")
+        sys.exit(0)
+    except Exception as e:
+        print(f"\n❌ An error occurred: {e}")
+        print("Please check your API key and try again")
+        sys.exit(1)
+    finally:
+        # Release the pooled connections and the event loop; runs on the
+        # sys.exit() paths above too.
+        if opamp is not None:
+            opamp.close()
+
+if __name__ == "__main__":
+    main()